@@ -1,7 +1,17 @@
+import os
+
+# The app scores one record per request/response, so OpenMP fork/join and per-thread
+# scratch buffers only add latency; pin to a single thread before xgboost is loaded
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
 import streamlit as st
 import pickle
+import hashlib
+import io
+import threading
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 import streamlit.components.v1 as components
 
 # -------------------------------
@@ -10,21 +20,108 @@ import streamlit.components.v1 as components
 
 st.set_page_config(layout="wide")
 
-# Load trained XGBoost model
-try:
-    with open('best_xgboost_model.pkl', 'rb') as file:
-        model = pickle.load(file)
-except FileNotFoundError:
-    st.error("`best_xgboost_model.pkl` not found! Please ensure the model file is in the correct directory.")
-    st.stop()
-
-# Load MinMaxScaler
-try:
-    with open('scaler.pkl', 'rb') as file:
-        scaler = pickle.load(file)
-except FileNotFoundError:
-    st.error("`scaler.pkl` not found! Please ensure the scaler file is available.")
-    st.stop()
+# Load trained XGBoost model (cached once per process, shared across sessions)
+@st.cache_resource
+def load_model(path):
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        st.error(f"`{path}` not found! Please ensure the model file is in the correct directory.")
+        st.stop()
+
+# Load MinMaxScaler (cached once per process, shared across sessions)
+@st.cache_resource
+def load_scaler(path):
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        st.error(f"`{path}` not found! Please ensure the scaler file is available.")
+        st.stop()
+
+# Underlying XGBoost booster for single-row scoring; one row gains nothing from threading
+@st.cache_resource
+def load_booster(path):
+    booster = load_model(path).get_booster()
+    booster.set_param({'nthread': 1})
+    return booster
+
+# Treelite-compiled booster (built by export_compiled_model.py) as (single-row, batch) predictors;
+# falls back to the booster, (None, None), if the library is absent, was compiled from a different
+# model file than the one the app loads, or cannot be loaded on this host
+@st.cache_resource
+def load_compiled_predictors(path, model_path, batch_nthread):
+    hash_path = os.path.splitext(path)[0] + '.sha256'
+    if not os.path.exists(path) or not os.path.exists(hash_path):
+        return None, None
+    with open(hash_path) as file:
+        compiled_from = file.read().strip()
+    with open(model_path, 'rb') as file:
+        if hashlib.sha256(file.read()).hexdigest() != compiled_from:
+            return None, None
+    try:
+        import tl2cgen
+        predictor = tl2cgen.Predictor(path, nthread=1)
+        batch_predictor = tl2cgen.Predictor(path, nthread=batch_nthread)
+    except Exception:
+        return None, None
+    return (
+        lambda row: predictor.predict(tl2cgen.DMatrix(row)).ravel(),
+        lambda rows: batch_predictor.predict(tl2cgen.DMatrix(rows)).ravel()
+    )
+
+# Separate booster for batch uploads, where OpenMP row parallelism pays off; an explicit
+# nthread overrides the process-wide OMP_NUM_THREADS=1 without touching the single-row booster
+@st.cache_resource
+def load_batch_booster(path):
+    booster = load_model(path).get_booster().copy()
+    booster.set_param({'nthread': os.cpu_count() or 1})
+    return booster
+
+model = load_model('best_xgboost_model.pkl')
+booster = load_booster('best_xgboost_model.pkl')
+batch_booster = load_batch_booster('best_xgboost_model.pkl')
+# Match the sklearn wrapper, which scores with the trees up to the early-stopping best iteration
+best_iteration = getattr(model, 'best_iteration', None)
+iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+compiled_predict, compiled_batch_predict = load_compiled_predictors(
+    'churn_model.so', 'best_xgboost_model.pkl', batch_nthread=os.cpu_count() or 1
+)
+scaler = load_scaler('scaler.pkl')
+
+# Load feature importance data from the Excel file (parsed once)
+@st.cache_data
+def load_feature_importance():
+    return pd.read_excel("feature_importance.xlsx", usecols=["Feature", "Feature Importance Score"])
+
+# Read page images once; st.image accepts the raw bytes
+@st.cache_data
+def load_png(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+# Build the feature importance bar chart once; the figure is static across reruns
+@st.cache_data
+def build_importance_fig():
+    feature_importance_df = load_feature_importance()
+    feats = feature_importance_df["Feature"].to_numpy()
+    scores = feature_importance_df["Feature Importance Score"].to_numpy()
+    order = np.argsort(scores, kind="stable")
+    fig = go.Figure(go.Bar(
+        x=scores[order],
+        y=feats[order],
+        orientation="h",
+        hovertemplate="Importance=%{x}<br>Features=%{y}<extra></extra>"  # Same hover labels as px.bar
+    ))
+    fig.update_layout(
+        title="Feature Importance",
+        xaxis_title="Importance",
+        yaxis_title="Features",
+        width=400,  # Set custom width
+        height=500  # Set custom height
+    )
+    return fig
 
 # -------------------------------
 # Step 2: Define Features
@@ -48,10 +145,39 @@ scale_vars = [
     'previous_month_balance', 'days_since_last_transaction'
 ]
 
+# Churn probability above which a customer is labelled as churned (same cut-off as model.predict)
+CHURN_THRESHOLD = 0.5
+
+# Manual encoding for categorical variables
+GENDER_MAP = {"Male": 1, "Female": 0}
+OCC_MAP = {"salaried": 1, "self-employed": 2, "unemployed": 3}
+NW_MAP = {"1": 1, "2": 2, "3": 3}
+CITY_MAP = {"1020": 1020, "1030": 1030}
+
+ENCODERS = {
+    "gender": GENDER_MAP,
+    "occupation": OCC_MAP,
+    "customer_nw_category": NW_MAP,
+    "city": CITY_MAP
+}
+CAT_ENCODE = {name: ENCODERS[name].__getitem__ for name in ENCODERS}
+
+# Per-feature encoder in model column order (numeric features pass straight through)
+ROW_ENCODE = [CAT_ENCODE.get(feature, float) for feature in feature_names]
+SCALE_IDX = np.array([feature_names.index(name) for name in scale_vars], dtype=np.intp)
+
+# MinMaxScaler parameters laid out over the full row (X_scaled = X * scale_ + min_);
+# unscaled columns get the identity so the whole row can be transformed in place.
+# Kept in float64 so the result matches scaler.transform bit for bit before the float32 cast
+row_scale = np.ones(len(feature_names), dtype=np.float64)
+row_min = np.zeros(len(feature_names), dtype=np.float64)
+row_scale[SCALE_IDX] = scaler.scale_
+row_min[SCALE_IDX] = scaler.min_
+
 
 # Step 3: Sidebar User Inputs (With Defaults)
 
-st.sidebar.image("Pic 1.png", use_container_width=True)  # Display Pic 1
+st.sidebar.image(load_png("Pic 1.png"), use_container_width=True)  # Display Pic 1
 st.sidebar.header("User Inputs")
 
 # Default values for user input (ensures valid predictions)
@@ -65,50 +191,99 @@ default_values = {
     "previous_month_balance": 43000, "days_since_last_transaction": 30
 }
 
-# Collect user inputs
-user_inputs = {}
-for feature in feature_names:
-    if feature in scale_vars:
-        user_inputs[feature] = st.sidebar.number_input(feature, value=default_values[feature], step=1)
-    else:
-        if feature == "gender":
-            user_inputs[feature] = st.sidebar.selectbox("Gender", options=["Male", "Female"], index=0)
-        elif feature == "occupation":
-            user_inputs[feature] = st.sidebar.selectbox("Occupation", options=["salaried", "self-employed", "unemployed"], index=0)
-        elif feature == "customer_nw_category":
-            user_inputs[feature] = st.sidebar.selectbox("Customer NW Category", options=["1", "2", "3"], index=0)
-        elif feature == "city":
-            user_inputs[feature] = st.sidebar.selectbox("City", options=["1020", "1030"], index=0)
+# Collect user inputs in a form so edits only rerun the app once, on submission;
+# each widget is keyed by its feature name so its value is read from st.session_state
+with st.sidebar.form("inputs"):
+    for feature in feature_names:
+        if feature in scale_vars:
+            st.number_input(feature, value=default_values[feature], step=1, key=feature)
         else:
-            user_inputs[feature] = st.sidebar.text_input(feature, value=default_values[feature])
-
-# Convert to DataFrame
-input_data = pd.DataFrame([user_inputs])
+            if feature == "gender":
+                st.selectbox("Gender", options=["Male", "Female"], index=0, key=feature)
+            elif feature == "occupation":
+                st.selectbox("Occupation", options=["salaried", "self-employed", "unemployed"], index=0, key=feature)
+            elif feature == "customer_nw_category":
+                st.selectbox("Customer NW Category", options=["1", "2", "3"], index=0, key=feature)
+            elif feature == "city":
+                st.selectbox("City", options=["1020", "1030"], index=0, key=feature)
+            else:
+                st.text_input(feature, value=default_values[feature], key=feature)
+    submitted = st.form_submit_button("Predict")
 
-# Ensure categorical variables are properly encoded (manual encoding for simplicity)
-input_data.replace({
-    "gender": {"Male": 1, "Female": 0},
-    "occupation": {"salaried": 1, "self-employed": 2, "unemployed": 3},
-    "customer_nw_category": {"1": 1, "2": 2, "3": 3},
-    "city": {"1020": 1020, "1030": 1030}
-}, inplace=True)
+# Optional batch scoring: score every row of an uploaded CSV in one model call
+st.sidebar.header("Batch Prediction")
+uploaded = st.sidebar.file_uploader("Batch CSV", type="csv")
 
 # -------------------------------
-# Step 4: Apply MinMaxScaler
+# Step 4: Encode and Apply MinMaxScaler
 # -------------------------------
 
-# Ensure all features are numeric before scaling
-try:
-    input_data_scaled = input_data.copy()
-    input_data_scaled[scale_vars] = scaler.transform(input_data[scale_vars])
-except ValueError as ve:
-    st.error(f"Invalid input! Please check the values of your fields. Details: {ve}")
-    st.stop()
+# Reusable input rows, one set per session so concurrent users never share the buffers:
+# a float64 scratch row for encoding/scaling (matching scaler.transform) and the float32 model row
+if "input_scratch" not in st.session_state:
+    st.session_state.input_scratch = np.empty((1, len(feature_names)), dtype=np.float64)
+    st.session_state.input_buf = np.empty((1, len(feature_names)), dtype=np.float32)
+
+def build_input_row():
+    """Encode the submitted inputs, scale them in float64 and downcast once into the session's float32 row."""
+    scratch = st.session_state.input_scratch
+    for i, (feature, encode) in enumerate(zip(feature_names, ROW_ENCODE)):
+        scratch[0, i] = encode(st.session_state[feature])
+    np.multiply(scratch, row_scale, out=scratch)
+    np.add(scratch, row_min, out=scratch)
+    row = st.session_state.input_buf
+    np.copyto(row, scratch, casting='same_kind')
+    return row
+
+def build_input_matrix(batch_df):
+    """Encode and scale a batch of customers (one per row) into a float32 matrix for the model."""
+    encoded = batch_df[feature_names]
+    # Map each categorical column through its encoder (values compared as strings, e.g. city 1020 -> "1020")
+    encoded = encoded.assign(**{
+        name: encoded[name].astype(str).map(mapping) for name, mapping in ENCODERS.items()
+    })
+    unknown = [name for name in ENCODERS if encoded[name].isna().any()]
+    if unknown:
+        raise ValueError(f"unrecognised values in column(s): {', '.join(unknown)}")
+    scratch = encoded.to_numpy(dtype=np.float64, copy=True)
+    np.multiply(scratch, row_scale, out=scratch)
+    np.add(scratch, row_min, out=scratch)
+    matrix = np.empty(scratch.shape, dtype=np.float32)
+    np.copyto(matrix, scratch, casting='same_kind')
+    return matrix
+
+def predict_churn_probs(matrix, batch=False):
+    """Churn probability per row of a contiguous float32 (n, 18) matrix, with no dtype conversion copy.
+
+    Single rows use the single-thread predictors; batches use the multi-threaded ones.
+    """
+    compiled = compiled_batch_predict if batch else compiled_predict
+    if compiled is not None:
+        return compiled(matrix)
+    return (batch_booster if batch else booster).inplace_predict(matrix, iteration_range=iteration_range)
+
+# Shared across sessions so only one all-cores batch scoring runs at a time
+@st.cache_resource
+def batch_scoring_lock():
+    return threading.Lock()
+
+# Parse, encode and score an uploaded CSV once per distinct file, so reruns (including
+# single-row Predict submits) don't redo the batch while the file sits in the uploader;
+# bounded so a stream of distinct uploads can't grow the cache without limit
+@st.cache_data(max_entries=8)
+def score_batch(csv_bytes):
+    batch_df = pd.read_csv(io.BytesIO(csv_bytes))
+    input_matrix = build_input_matrix(batch_df)
+    with batch_scoring_lock():
+        churn_probs = predict_churn_probs(input_matrix, batch=True)
+    batch_df["Churn Probability"] = churn_probs
+    batch_df["Predicted Value"] = np.where(churn_probs > CHURN_THRESHOLD, "Churned", "Retained")
+    return batch_df
 
 # -------------------------------
 # Step 5: Prediction
 # -------------------------------
-st.image("Pic 2.png", use_container_width=True)  # Display Pic 2
+st.image(load_png("Pic 2.png"), use_container_width=True)  # Display Pic 2
 st.title("Customer Churn Prediction")
 
 # Page Layout
@@ -116,32 +291,26 @@ left_col, right_col = st.columns(2)
 
 with left_col:
     st.header("Feature Importance")
-    # Load feature importance data from the Excel file
-    feature_importance_df = pd.read_excel("feature_importance.xlsx", usecols=["Feature", "Feature Importance Score"])
     # Plot the feature importance bar chart
-    fig = px.bar(
-        feature_importance_df.sort_values(by="Feature Importance Score", ascending=True),
-        x="Feature Importance Score",
-        y="Feature",
-        orientation="h",
-        title="Feature Importance",
-        labels={"Feature Importance Score": "Importance", "Feature": "Features"},
-        width=400,  # Set custom width
-        height=500  # Set custom height
-    )
-    st.plotly_chart(fig)
+    st.plotly_chart(build_importance_fig())
 
 # Right Page: Prediction
 with right_col:
     st.header("Prediction")
-    if st.button("Predict"):
+    if submitted:
+        try:
+            input_row = build_input_row()
+        except ValueError as ve:
+            st.error(f"Invalid input! Please check the values of your fields. Details: {ve}")
+            st.stop()
         try:
-            # Get predicted probabilities and label
-            probabilities = model.predict_proba(input_data_scaled)[0]
-            prediction = model.predict(input_data_scaled)[0]
+            # Get predicted probabilities and label from a single booster pass
+            churn_prob = float(predict_churn_probs(input_row)[0])
+            probabilities = (1.0 - churn_prob, churn_prob)
+            prediction = int(churn_prob > CHURN_THRESHOLD)
     
             # Map prediction to label
-            prediction_label = "Churned" if prediction == 1 else "Retained"
+            prediction_label = "Churned" if prediction else "Retained"
     
             # Display results
             st.subheader(f"Predicted Value: **{prediction_label}**")
@@ -157,13 +326,24 @@ with right_col:
         except Exception as e:
             st.error(f" Error in prediction: {e}")
 
+    if uploaded is not None:
+        st.header("Batch Predictions")
+        try:
+            scored_df = score_batch(uploaded.getvalue())
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, KeyError, ValueError) as e:
+            # Report and skip the table; stopping here would also hide the dashboard below
+            st.error(f"Invalid batch file! Please check the columns and values in your CSV. Details: {e}")
+        except Exception as e:
+            st.error(f" Error in prediction: {e}")
+        else:
+            st.dataframe(scored_df)
+
 # Step 6: Display Tableau Dashboard
 #st.header("Customer Insights Dashboard")
 #tableau_url = "https://public.tableau.com/views/Churn_Dashboard_17397175233280/Dashboard1?:language=en-US&publish=yes&:sid=&:redirect=auth&:display_count=n&:origin=viz_share_link"
 #st.markdown(f'<iframe src="{tableau_url}" width="100%" height="600"></iframe>', unsafe_allow_html=True)
 
-embed_code = '''
-<div class='tableauPlaceholder' id='viz1739763468407' style='position: relative'><noscript><a href='#'><img alt='Dashboard 1 ' src='https:&#47;&#47;public.tableau.com&#47;static&#47;images&#47;Ch&#47;Churn_Dashboard_17397175233280&#47;Dashboard1&#47;1_rss.png' style='border: none' /></a></noscript><object class='tableauViz'  style='display:none;'><param name='host_url' value='https%3A%2F%2Fpublic.tableau.com%2F' /> <param name='embed_code_version' value='3' /> <param name='site_root' value='' /><param name='name' value='Churn_Dashboard_17397175233280&#47;Dashboard1' /><param name='tabs' value='no' /><param name='toolbar' value='yes' /><param name='static_image' value='https:&#47;&#47;public.tableau.com&#47;static&#47;images&#47;Ch&#47;Churn_Dashboard_17397175233280&#47;Dashboard1&#47;1.png' /> <param name='animate_transition' value='yes' /><param name='display_static_image' value='yes' /><param name='display_spinner' value='yes' /><param name='display_overlay' value='yes' /><param name='display_count' value='yes' /><param name='language' value='en-US' /></object></div>                <script type='text/javascript'>                    var divElement = document.getElementById('viz1739763468407');                    var vizElement = divElement.getElementsByTagName('object')[0];                    if ( divElement.offsetWidth > 800 ) { vizElement.style.width='1100px';vizElement.style.height='607px';} else if ( divElement.offsetWidth > 500 ) { vizElement.style.width='1100px';vizElement.style.height='607px';} else { vizElement.style.width='100%';vizElement.style.height='1627px';}                     var scriptElement = document.createElement('script');                    scriptElement.src = 'https://public.tableau.com/javascripts/api/viz_v1.js';                    vizElement.parentNode.insertBefore(scriptElement, vizElement);                </script>
-''' 
+# Embed the published viz by URL so the browser loads (and caches) it directly
+tableau_embed_url = "https://public.tableau.com/views/Churn_Dashboard_17397175233280/Dashboard1?:embed=y&:showVizHome=no&:tabs=no&:toolbar=yes&:display_count=yes&:language=en-US"
 st.header("Customer Insights Dashboard")
-components.html(embed_code, height=800)
\ No newline at end of file
+components.iframe(tableau_embed_url, height=800, scrolling=True)
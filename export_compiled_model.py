@@ -0,0 +1,26 @@
+import hashlib
+import pickle
+
+import tl2cgen
+import treelite
+
+# -------------------------------
+# Compile the trained XGBoost model into a native predictor for churn_app.py
+# -------------------------------
+
+with open('best_xgboost_model.pkl', 'rb') as file:
+    model_bytes = file.read()
+model = pickle.loads(model_bytes)
+
+# Keep only the trees the sklearn wrapper scores with (early-stopping best iteration)
+booster = model.get_booster()
+best_iteration = getattr(model, 'best_iteration', None)
+if best_iteration is not None:
+    booster = booster[:best_iteration + 1]
+
+tl_model = treelite.frontend.from_xgboost(booster)
+tl2cgen.export_lib(tl_model, toolchain='gcc', libpath='churn_model.so', params={'parallel_comp': 4})
+
+# Record which model file the library was compiled from; the app ignores a stale library
+with open('churn_model.sha256', 'w') as file:
+    file.write(hashlib.sha256(model_bytes).hexdigest())